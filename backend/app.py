@@ -1,3 +1,6 @@
+import os
+from datetime import date, datetime
+import click
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -32,15 +35,23 @@ def create_app():
     # Create tables first
     with app.app_context():
         db.create_all()
+        
+        # Workers on a fresh deploy would otherwise answer lookups with 503
+        # until some ingestion happens to add a threat
+        from services.snapshot_service import rebuild_snapshot
+        if not os.path.exists(Config.SNAPSHOT_PATH):
+            rebuild_snapshot()
     
     # Then import and register blueprints
     from routes.auth import bp as auth_bp
     from routes.threats import bp as threats_bp
     from routes.feeds import bp as feeds_bp
+    from routes.watchlists import bp as watchlists_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(threats_bp)
     app.register_blueprint(feeds_bp)
+    app.register_blueprint(watchlists_bp)
     
     @app.route('/')
     def index():
@@ -50,7 +61,8 @@ def create_app():
             'endpoints': {
                 'auth': '/api/auth',
                 'threats': '/api/threats',
-                'feeds': '/api/feeds'
+                'feeds': '/api/feeds',
+                'watchlists': '/api/watchlists'
             }
         })
     
@@ -58,6 +70,47 @@ def create_app():
     def health():
         return jsonify({'status': 'healthy'})
     
+    @app.cli.command('rescore-threats')
+    def rescore_threats_command():
+        """Recompute risk scores for all active threats (run periodically)"""
+        from services.scoring_service import rescore_threats
+        
+        result = rescore_threats()
+        
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        
+        click.echo(f"Scored {result['scored']} threats, {result['written']} changed")
+    
+    @app.cli.command('replay-feeds')
+    @click.option('--start', 'start_date', required=True, help='First fetch date (YYYY-MM-DD)')
+    @click.option('--end', 'end_date', default=None, help='Last fetch date (YYYY-MM-DD), defaults to today')
+    @click.option('--source', 'sources', multiple=True, help='Only replay these sources (repeatable)')
+    @click.option('--workers', type=int, default=None, help='Parser processes, defaults to CPU count')
+    @click.option('--update-existing', is_flag=True, help='Overwrite already stored threats with re-parsed values')
+    def replay_feeds(start_date, end_date, sources, workers, update_existing):
+        """Re-ingest archived feed payloads for a date range"""
+        from services.replay_service import replay_archive
+        
+        result = replay_archive(
+            date.fromisoformat(start_date),
+            date.fromisoformat(end_date) if end_date else datetime.utcnow().date(),
+            sources=list(sources) or None,
+            workers=workers,
+            update_existing=update_existing
+        )
+        
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        
+        click.echo(
+            f"Replayed {result['payloads']} payloads, added {result['added']} threats, "
+            f"updated {result['updated']} threats, "
+            f"quarantined {result['quarantined']} records"
+        )
+        for error in result['errors']:
+            click.echo(f"  {error['source']} {error['sha256'][:12]}: {error['error']}", err=True)
+    
     return app
 
 if __name__ == '__main__':
@@ -9,6 +9,13 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
     
+    # Generated artifacts (indicator snapshot, raw feed archive, blocklist filters)
+    DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(DATA_DIR, 'indicators.snap'))
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(DATA_DIR, 'archive'))
+    FILTER_DIR = os.getenv('FILTER_DIR', os.path.join(DATA_DIR, 'filters'))
+    FILTER_FALSE_POSITIVE_RATE = float(os.getenv('FILTER_FALSE_POSITIVE_RATE', '0.001'))
+    
     # API Keys
     ABUSEIPDB_API_KEY = os.getenv('ABUSEIPDB_API_KEY')
     VIRUSTOTAL_API_KEY = os.getenv('VIRUSTOTAL_API_KEY')
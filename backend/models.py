@@ -13,6 +13,7 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     bookmarks = db.relationship('Bookmark', backref='user', lazy=True, cascade='all, delete-orphan')
+    watchlists = db.relationship('Watchlist', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -45,6 +46,7 @@ class Threat(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     bookmarks = db.relationship('Bookmark', backref='threat', lazy=True, cascade='all, delete-orphan')
+    score = db.relationship('ThreatScore', uselist=False, lazy='joined', cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -56,6 +58,7 @@ class Threat(db.Model):
             'description': self.description or '',
             'severity': self.severity or '',
             'confidence_score': self.confidence_score,
+            'risk_score': self.score.risk_score if self.score else None,
             'indicators': self.indicators or {},
             'metadata': self.threat_metadata or {},
             'date_discovered': self.date_discovered.isoformat() if self.date_discovered else None,
@@ -63,6 +66,20 @@ class Threat(db.Model):
             'is_active': self.is_active
         }
 
+class ThreatScore(db.Model):
+    __tablename__ = 'threat_scores'
+    
+    threat_id = db.Column(db.Integer, db.ForeignKey('threats.id'), primary_key=True)
+    risk_score = db.Column(db.Float, nullable=False, index=True)
+    scored_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Bookmark(db.Model):
     __tablename__ = 'bookmarks'
     
@@ -81,4 +98,92 @@ class Bookmark(db.Model):
             'threat_id': self.threat_id,
             'notes': self.notes,
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class Watchlist(db.Model):
+    __tablename__ = 'watchlists'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    vendors = db.Column(db.JSON)
+    products = db.Column(db.JSON)
+    cve_patterns = db.Column(db.JSON)
+    ip_ranges = db.Column(db.JSON)
+    keywords = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    notifications = db.relationship('WatchlistNotification', backref='watchlist', lazy=True, cascade='all, delete-orphan')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'vendors': self.vendors or [],
+            'products': self.products or [],
+            'cve_patterns': self.cve_patterns or [],
+            'ip_ranges': self.ip_ranges or [],
+            'keywords': self.keywords or [],
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class WatchlistNotification(db.Model):
+    __tablename__ = 'watchlist_notifications'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    watchlist_id = db.Column(db.Integer, db.ForeignKey('watchlists.id'), nullable=False)
+    threat_id = db.Column(db.Integer, db.ForeignKey('threats.id'), nullable=False)
+    matched_on = db.Column(db.JSON)
+    is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    threat = db.relationship('Threat')
+    
+    __table_args__ = (db.UniqueConstraint('watchlist_id', 'threat_id'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'watchlist_id': self.watchlist_id,
+            'threat': self.threat.to_dict() if self.threat else None,
+            'matched_on': self.matched_on or [],
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat()
+        }
+
+class QuarantinedRecord(db.Model):
+    __tablename__ = 'quarantined_records'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False, index=True)
+    stage = db.Column(db.String(20), nullable=False)
+    payload_sha256 = db.Column(db.String(64))
+    record = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'stage': self.stage,
+            'payload_sha256': self.payload_sha256,
+            'record': self.record,
+            'error': self.error,
+            'created_at': self.created_at.isoformat()
+        }
+
+class IngestCheckpoint(db.Model):
+    __tablename__ = 'ingest_checkpoints'
+    
+    payload_sha256 = db.Column(db.String(64), primary_key=True)
+    source = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    committed = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
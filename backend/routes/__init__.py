@@ -1,2 +1,2 @@
 # routes/__init__.py
-from . import auth, threats, feeds
\ No newline at end of file
+from . import auth, threats, feeds, watchlists
\ No newline at end of file
@@ -1,6 +1,11 @@
-from flask import Blueprint, jsonify
+import os
+from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required
+from models import QuarantinedRecord
 from services.cisa_service import fetch_cisa_threats
+from services.scoring_service import rescore_threats
+from services.filter_service import FILTER_TYPES, load_manifest, rebuild_filters, filter_path
+from services.snapshot_service import rebuild_snapshot
 
 bp = Blueprint('feeds', __name__, url_prefix='/api/feeds')
 
@@ -15,11 +20,109 @@ def fetch_cisa():
         return jsonify({
             'message': 'CISA threats fetched successfully',
             'added': result['added'],
+            'quarantined': result['quarantined'],
             'total': result['total']
         })
     else:
         return jsonify({'error': result['error']}), 500
 
+@bp.route('/rescore', methods=['POST'])
+@jwt_required()
+def rescore():
+    """Recompute risk scores for all active threats"""
+    result = rescore_threats()
+    
+    if result['success']:
+        return jsonify({
+            'message': 'Risk scores recomputed successfully',
+            'scored': result['scored']
+        })
+    else:
+        return jsonify({'error': result['error']}), 500
+
+@bp.route('/filters', methods=['GET'])
+@jwt_required()
+def get_filters():
+    """List published blocklist filters and their current versions"""
+    return jsonify({'filters': load_manifest()})
+
+@bp.route('/filters/<filter_type>', methods=['GET'])
+@jwt_required()
+def download_filter(filter_type):
+    """Download the current bloom filter for an indicator type"""
+    if filter_type not in FILTER_TYPES:
+        return jsonify({'error': 'Unknown filter type'}), 404
+    
+    entry = load_manifest().get(filter_type)
+    path = filter_path(filter_type)
+    if not entry or not os.path.exists(path):
+        return jsonify({'error': 'Filter not built yet'}), 404
+    
+    response = send_file(
+        path,
+        mimetype='application/octet-stream',
+        as_attachment=True,
+        download_name=f"{filter_type}-{entry['version']}.bloom",
+        etag=entry['sha256'],
+        conditional=True
+    )
+    response.headers['X-Filter-Version'] = str(entry['version'])
+    return response
+
+@bp.route('/filters/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_filters_route():
+    """Rebuild all blocklist filters from scratch"""
+    result = rebuild_filters()
+    
+    if result['success']:
+        return jsonify({
+            'message': 'Filters rebuilt successfully',
+            'version': result['version'],
+            'counts': result['counts']
+        })
+    else:
+        return jsonify({'error': result['error']}), 500
+
+@bp.route('/snapshot/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_snapshot_route():
+    """Rebuild the shared indicator snapshot from active threats"""
+    result = rebuild_snapshot()
+    
+    if result['success']:
+        return jsonify({
+            'message': 'Snapshot rebuilt successfully',
+            'generation': result['generation'],
+            'threats': result['threats'],
+            'indicators': result['indicators']
+        })
+    else:
+        return jsonify({'error': result['error']}), 500
+
+@bp.route('/quarantine', methods=['GET'])
+@jwt_required()
+def get_quarantine():
+    """List feed records that could not be parsed or stored"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    source = request.args.get('source')
+    
+    query = QuarantinedRecord.query
+    if source:
+        query = query.filter_by(source=source)
+    
+    query = query.order_by(QuarantinedRecord.created_at.desc(), QuarantinedRecord.id.desc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return jsonify({
+        'records': [record.to_dict() for record in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page,
+        'per_page': per_page
+    })
+
 @bp.route('/sources', methods=['GET'])
 @jwt_required()
 def get_sources():
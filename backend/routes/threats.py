@@ -1,13 +1,86 @@
-from flask import Blueprint, request, jsonify
+import hashlib
+import time
+from functools import wraps
+from flask import Blueprint, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_, and_
-from models import db, Threat, Bookmark, User
+from models import db, Threat, ThreatScore, Bookmark, User
+from services.snapshot_service import get_snapshot
+from services.version_service import get_version, bump_version, bookmarks_version_key, THREATS_VERSION
 from datetime import datetime, timedelta
 
 bp = Blueprint('threats', __name__, url_prefix='/api/threats')
 
+# Responses with windows relative to now (stats, ?days=) change as time
+# passes, so their ETags also roll over every this many seconds
+TIME_WINDOW_ETAG_SECONDS = 300
+
+
+def conditional(make_etag_parts):
+    """Answer If-None-Match with 304 before the view runs any queries.
+    
+    make_etag_parts returns the data versions and request details the
+    response depends on; they are hashed into a strong ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            parts = [request.endpoint] + [str(part) for part in make_etag_parts()]
+            etag = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+            
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _time_window():
+    return int(time.time() // TIME_WINDOW_ETAG_SECONDS)
+
+
+def _threats_etag_parts():
+    parts = [get_version(THREATS_VERSION), request.query_string.decode('utf-8')]
+    if request.args.get('days'):
+        parts.append(_time_window())
+    return parts
+
+
+def _stats_etag_parts():
+    return [get_version(THREATS_VERSION), _time_window()]
+
+
+def _bookmarks_etag_parts():
+    user_id = int(get_jwt_identity())
+    return [user_id, get_version(THREATS_VERSION), get_version(bookmarks_version_key(user_id))]
+
+
+def _apply_sort(query, sort_by, sort_order):
+    """Order a threat query by a column name or by risk_score"""
+    if sort_by == 'risk_score':
+        query = query.outerjoin(ThreatScore, ThreatScore.threat_id == Threat.id)
+        sort_column = ThreatScore.risk_score
+    elif sort_by in Threat.__table__.columns:
+        sort_column = getattr(Threat, sort_by)
+    else:
+        return query
+    
+    if sort_order == 'asc':
+        return query.order_by(sort_column.asc().nullsfirst(), Threat.id.asc())
+    else:
+        return query.order_by(sort_column.desc().nullslast(), Threat.id.desc())
+
+
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(_threats_etag_parts)
 def get_threats():
     """Get all threats with optional filtering"""
     try:
@@ -19,6 +92,8 @@ def get_threats():
         severity = request.args.get('severity')
         search = request.args.get('search')
         days = request.args.get('days', type=int)
+        sort_by = request.args.get('sort_by', 'date_discovered')
+        sort_order = request.args.get('sort_order', 'desc')
         
         # Start with base query
         query = Threat.query.filter_by(is_active=True)
@@ -47,8 +122,8 @@ def get_threats():
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             query = query.filter(Threat.date_discovered >= cutoff_date)
         
-        # Order by most recent first
-        query = query.order_by(Threat.date_discovered.desc())
+        # Order by most recent first unless asked otherwise
+        query = _apply_sort(query, sort_by, sort_order)
         
         # Paginate results
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -99,6 +174,7 @@ def get_threat(threat_id):
 
 @bp.route('/stats', methods=['GET'])
 @jwt_required()
+@conditional(_stats_etag_parts)
 def get_stats():
     """Get statistics about threats"""
     try:
@@ -159,8 +235,31 @@ def get_stats():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/lookup', methods=['GET'])
+@jwt_required()
+def lookup_indicator():
+    """Look up an indicator (IP, URL, host, CVE) in the shared snapshot"""
+    value = request.args.get('value')
+    if not value:
+        return jsonify({'error': 'value parameter required'}), 400
+    
+    snapshot = get_snapshot()
+    matches = snapshot.lookup(value)
+    
+    if matches is None:
+        return jsonify({'error': 'Indicator snapshot not built yet'}), 503
+    
+    return jsonify({
+        'value': value,
+        'matches': matches,
+        'total': len(matches),
+        'generation': snapshot.generation
+    })
+
+
 @bp.route('/bookmarks', methods=['GET'])
 @jwt_required()
+@conditional(_bookmarks_etag_parts)
 def get_bookmarks():
     """Get all bookmarked threats for current user"""
     user_id = int(get_jwt_identity())
@@ -203,6 +302,7 @@ def bookmark_threat(threat_id):
     )
     
     db.session.add(bookmark)
+    bump_version(bookmarks_version_key(user_id))
     db.session.commit()
     
     return jsonify({
@@ -225,6 +325,7 @@ def update_bookmark(threat_id):
     if 'notes' in data:
         bookmark.notes = data['notes']
     
+    bump_version(bookmarks_version_key(user_id))
     db.session.commit()
     
     return jsonify({
@@ -244,6 +345,7 @@ def unbookmark_threat(threat_id):
         return jsonify({'error': 'Bookmark not found'}), 404
     
     db.session.delete(bookmark)
+    bump_version(bookmarks_version_key(user_id))
     db.session.commit()
     
     return jsonify({'message': 'Bookmark removed successfully'})
@@ -298,12 +400,7 @@ def advanced_search():
         sort_by = data.get('sort_by', 'date_discovered')
         sort_order = data.get('sort_order', 'desc')
         
-        if hasattr(Threat, sort_by):
-            sort_column = getattr(Threat, sort_by)
-            if sort_order == 'asc':
-                query = query.order_by(sort_column.asc())
-            else:
-                query = query.order_by(sort_column.desc())
+        query = _apply_sort(query, sort_by, sort_order)
         
         # Pagination
         page = data.get('page', 1)
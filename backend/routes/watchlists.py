@@ -0,0 +1,169 @@
+import ipaddress
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Watchlist, WatchlistNotification
+
+bp = Blueprint('watchlists', __name__, url_prefix='/api/watchlists')
+
+WATCHLIST_FIELDS = ('vendors', 'products', 'cve_patterns', 'ip_ranges', 'keywords')
+
+
+def _clean_terms(data):
+    """Pull the term lists out of a request body, rejecting non-list values and bad IP ranges"""
+    terms = {}
+    for field in WATCHLIST_FIELDS:
+        if field in data:
+            value = data[field]
+            if not isinstance(value, list):
+                raise ValueError(f"{field} must be a list")
+            terms[field] = [str(term).strip() for term in value if str(term).strip()]
+
+    for ip_range in terms.get('ip_ranges', []):
+        try:
+            ipaddress.ip_network(ip_range, strict=False)
+        except ValueError:
+            raise ValueError(f"Invalid IP range: {ip_range}")
+    return terms
+
+
+@bp.route('/', methods=['GET'])
+@jwt_required()
+def get_watchlists():
+    """Get all watchlists for current user"""
+    user_id = int(get_jwt_identity())
+
+    watchlists = Watchlist.query.filter_by(user_id=user_id).all()
+
+    return jsonify({
+        'watchlists': [watchlist.to_dict() for watchlist in watchlists],
+        'total': len(watchlists)
+    })
+
+
+@bp.route('/', methods=['POST'])
+@jwt_required()
+def create_watchlist():
+    """Create a watchlist"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+
+    if not data.get('name'):
+        return jsonify({'error': 'Name required'}), 400
+
+    try:
+        terms = _clean_terms(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not any(terms.values()):
+        return jsonify({'error': 'At least one watch term required'}), 400
+
+    watchlist = Watchlist(user_id=user_id, name=data['name'], **terms)
+
+    db.session.add(watchlist)
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Watchlist created successfully',
+        'watchlist': watchlist.to_dict()
+    }), 201
+
+
+@bp.route('/<int:watchlist_id>', methods=['PUT'])
+@jwt_required()
+def update_watchlist(watchlist_id):
+    """Update a watchlist's name or terms"""
+    user_id = int(get_jwt_identity())
+
+    watchlist = Watchlist.query.filter_by(id=watchlist_id, user_id=user_id).first()
+    if not watchlist:
+        return jsonify({'error': 'Watchlist not found'}), 404
+
+    data = request.get_json() or {}
+
+    try:
+        terms = _clean_terms(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if data.get('name'):
+        watchlist.name = data['name']
+    for field, value in terms.items():
+        setattr(watchlist, field, value)
+
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Watchlist updated successfully',
+        'watchlist': watchlist.to_dict()
+    })
+
+
+@bp.route('/<int:watchlist_id>', methods=['DELETE'])
+@jwt_required()
+def delete_watchlist(watchlist_id):
+    """Delete a watchlist and its notifications"""
+    user_id = int(get_jwt_identity())
+
+    watchlist = Watchlist.query.filter_by(id=watchlist_id, user_id=user_id).first()
+    if not watchlist:
+        return jsonify({'error': 'Watchlist not found'}), 404
+
+    db.session.delete(watchlist)
+    db.session.commit()
+
+    return jsonify({'message': 'Watchlist deleted successfully'})
+
+
+@bp.route('/notifications', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    """Get watchlist matches for current user, newest first"""
+    user_id = int(get_jwt_identity())
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    unread_only = request.args.get('unread', 'false').lower() == 'true'
+
+    query = WatchlistNotification.query.filter_by(user_id=user_id)
+    if unread_only:
+        query = query.filter_by(is_read=False)
+
+    query = query.order_by(WatchlistNotification.created_at.desc(), WatchlistNotification.id.desc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+
+    unread_count = WatchlistNotification.query.filter_by(user_id=user_id, is_read=False).count()
+
+    return jsonify({
+        'notifications': [notification.to_dict() for notification in pagination.items],
+        'total': pagination.total,
+        'unread': unread_count,
+        'pages': pagination.pages,
+        'current_page': page,
+        'per_page': per_page
+    })
+
+
+@bp.route('/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_notifications_read():
+    """Mark notifications as read (all of them if no ids are given)"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list):
+            return jsonify({'error': 'ids must be a list'}), 400
+        try:
+            ids = [int(notification_id) for notification_id in ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'ids must be integers'}), 400
+
+    query = WatchlistNotification.query.filter_by(user_id=user_id, is_read=False)
+    if ids is not None:
+        query = query.filter(WatchlistNotification.id.in_(ids))
+
+    updated = query.update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+
+    return jsonify({'message': 'Notifications marked as read', 'updated': updated})
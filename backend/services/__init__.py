@@ -1,2 +1,2 @@
 # services/__init__.py
-from . import cisa_service, abuseipdb_service, urlhaus_service
\ No newline at end of file
+from . import cisa_service, abuseipdb_service, urlhaus_service, snapshot_service, watchlist_service, scoring_service, filter_service, version_service, ingest_service, archive_service, replay_service
\ No newline at end of file
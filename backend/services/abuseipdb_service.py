@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime
-from models import db, Threat
+from models import db
+from services.archive_service import archive_payload
+from services.ingest_service import store_threats, parse_records
 from config import Config
 
 ABUSEIPDB_API_URL = "https://api.abuseipdb.com/api/v2/blacklist"
@@ -24,53 +26,55 @@ def fetch_abuseipdb_threats():
         
         response = requests.get(ABUSEIPDB_API_URL, headers=headers, params=params, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        archived = archive_payload('AbuseIPDB', response.content, url=ABUSEIPDB_API_URL)
         
-        if 'data' not in data:
-            return {'success': False, 'error': 'Invalid API response'}
+        records, rejected = parse_abuseipdb_payload(response.json())
+        result = store_threats(records, 'AbuseIPDB', rejected=rejected, payload_sha256=archived.get('sha256'))
         
-        ips = data['data']
-        added_count = 0
-        
-        for ip_data in ips:
-            threat_id = f"IP-{ip_data['ipAddress']}"
-            
-            # Check if already exists
-            existing = Threat.query.filter_by(threat_id=threat_id).first()
-            
-            if not existing:
-                threat = Threat(
-                    threat_id=threat_id,
-                    source='AbuseIPDB',
-                    threat_type='malicious_ip',
-                    title=f"Malicious IP: {ip_data['ipAddress']}",
-                    description=f"Reported {ip_data['totalReports']} times",
-                    severity=_get_severity_from_confidence(ip_data['abuseConfidenceScore']),
-                    confidence_score=ip_data['abuseConfidenceScore'],
-                    indicators={
-                        'ip_address': ip_data['ipAddress'],
-                        'country_code': ip_data.get('countryCode', 'Unknown'),
-                        'isp': ip_data.get('isp', 'Unknown')
-                    },
-                    metadata={
-                        'total_reports': ip_data['totalReports'],
-                        'num_distinct_users': ip_data.get('numDistinctUsers', 0),
-                        'usage_type': ip_data.get('usageType', 'Unknown'),
-                        'domain': ip_data.get('domain', '')
-                    },
-                    date_discovered=datetime.fromisoformat(ip_data['lastReportedAt'].replace('Z', '+00:00'))
-                )
-                db.session.add(threat)
-                added_count += 1
-        
-        db.session.commit()
-        return {'success': True, 'added': added_count, 'total': len(ips)}
+        return {
+            'success': True,
+            'added': len(result['new_threats']),
+            'quarantined': result['quarantined'],
+            'total': len(records) + len(rejected)
+        }
     
     except Exception as e:
         db.session.rollback()
         return {'success': False, 'error': str(e)}
 
 
+def parse_abuseipdb_payload(data):
+    """Turn an AbuseIPDB blacklist payload into Threat column values and rejected records"""
+    if 'data' not in data:
+        raise ValueError('Invalid API response')
+    
+    return parse_records(data['data'], _parse_ip)
+
+
+def _parse_ip(ip_data):
+    return {
+        'threat_id': f"IP-{ip_data['ipAddress']}",
+        'source': 'AbuseIPDB',
+        'threat_type': 'malicious_ip',
+        'title': f"Malicious IP: {ip_data['ipAddress']}",
+        'description': f"Reported {ip_data['totalReports']} times",
+        'severity': _get_severity_from_confidence(ip_data['abuseConfidenceScore']),
+        'confidence_score': ip_data['abuseConfidenceScore'],
+        'indicators': {
+            'ip_address': ip_data['ipAddress'],
+            'country_code': ip_data.get('countryCode', 'Unknown'),
+            'isp': ip_data.get('isp', 'Unknown')
+        },
+        'threat_metadata': {
+            'total_reports': ip_data['totalReports'],
+            'num_distinct_users': ip_data.get('numDistinctUsers', 0),
+            'usage_type': ip_data.get('usageType', 'Unknown'),
+            'domain': ip_data.get('domain', '')
+        },
+        'date_discovered': datetime.fromisoformat(ip_data['lastReportedAt'].replace('Z', '+00:00'))
+    }
+
+
 def _get_severity_from_confidence(confidence):
     """Convert confidence score to severity level"""
     if confidence >= 90:
@@ -80,4 +84,4 @@ def _get_severity_from_confidence(confidence):
     elif confidence >= 50:
         return 'medium'
     else:
-        return 'low'
\ No newline at end of file
+        return 'low'
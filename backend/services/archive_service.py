@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from config import Config
+
+# Layout under ARCHIVE_DIR:
+#   objects/<sha[:2]>/<sha>.gz    gzip-compressed raw payload, named by content hash
+#   index/<YYYY-MM-DD>.jsonl      one metadata line per fetch on that (UTC) day
+
+
+def _object_path(archive_dir, sha256):
+    return os.path.join(archive_dir, 'objects', sha256[:2], f"{sha256}.gz")
+
+
+def archive_payload(source, payload, url=None, fetched_at=None, archive_dir=None):
+    """Store a raw feed payload compressed and content-addressed, and index the fetch"""
+    archive_dir = archive_dir or Config.ARCHIVE_DIR
+    fetched_at = fetched_at or datetime.utcnow()
+
+    try:
+        sha256 = hashlib.sha256(payload).hexdigest()
+        path = _object_path(archive_dir, sha256)
+
+        # Identical payloads are stored once; every fetch is still indexed
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+        entry = {
+            'source': source,
+            'sha256': sha256,
+            'url': url,
+            'size': len(payload),
+            'fetched_at': fetched_at.isoformat()
+        }
+
+        index_dir = os.path.join(archive_dir, 'index')
+        os.makedirs(index_dir, exist_ok=True)
+        with open(os.path.join(index_dir, f"{fetched_at.date().isoformat()}.jsonl"), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+        return {'success': True, 'sha256': sha256}
+
+    except Exception as e:
+        print(f"Error archiving {source} payload: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+def list_archived(start_date, end_date, sources=None, archive_dir=None):
+    """Index entries fetched between two dates (inclusive), oldest first"""
+    archive_dir = archive_dir or Config.ARCHIVE_DIR
+    index_dir = os.path.join(archive_dir, 'index')
+
+    entries = []
+    day = start_date
+    while day <= end_date:
+        index_path = os.path.join(index_dir, f"{day.isoformat()}.jsonl")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if sources and entry['source'] not in sources:
+                        continue
+                    entry['path'] = _object_path(archive_dir, entry['sha256'])
+                    entries.append(entry)
+        day += timedelta(days=1)
+
+    entries.sort(key=lambda entry: entry['fetched_at'])
+    return entries
+
+
+def load_payload(path):
+    """Decompress and decode an archived JSON payload"""
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read())
@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime
-from models import db, Threat
+from models import db
+from services.archive_service import archive_payload
+from services.ingest_service import store_threats, parse_records
 
 CISA_KEV_URL = "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json"
 
@@ -10,44 +12,51 @@ def fetch_cisa_threats():
         print("Fetching from CISA...")
         response = requests.get(CISA_KEV_URL, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        archived = archive_payload('CISA', response.content, url=CISA_KEV_URL)
         
-        vulnerabilities = data.get('vulnerabilities', [])
-        added_count = 0
+        records, rejected = parse_cisa_payload(response.json())
         
-        print(f"Processing {len(vulnerabilities)} vulnerabilities...")
+        print(f"Processing {len(records) + len(rejected)} vulnerabilities...")
         
-        for vuln in vulnerabilities:
-            existing = Threat.query.filter_by(threat_id=vuln['cveID']).first()
-            
-            if not existing:
-                threat = Threat(
-                    threat_id=vuln['cveID'],
-                    source='CISA',
-                    threat_type='vulnerability',
-                    title=vuln.get('vulnerabilityName', 'Unknown'),
-                    description=vuln.get('shortDescription', ''),
-                    severity='critical',
-                    indicators={
-                        'vendor': vuln.get('vendorProject', ''),
-                        'product': vuln.get('product', ''),
-                        'cve_id': vuln['cveID']
-                    },
-                    threat_metadata={
-                        'required_action': vuln.get('requiredAction', ''),
-                        'due_date': vuln.get('dueDate', ''),
-                        'known_ransomware': vuln.get('knownRansomwareCampaignUse', 'Unknown')
-                    },
-                    date_discovered=datetime.strptime(vuln['dateAdded'], '%Y-%m-%d') if vuln.get('dateAdded') else None
-                )
-                db.session.add(threat)
-                added_count += 1
-        
-        db.session.commit()
-        print(f"Added {added_count} threats")
-        return {'success': True, 'added': added_count, 'total': len(vulnerabilities)}
+        result = store_threats(records, 'CISA', rejected=rejected, payload_sha256=archived.get('sha256'))
+        added_count = len(result['new_threats'])
         
+        print(f"Added {added_count} threats, quarantined {result['quarantined']}")
+        return {
+            'success': True,
+            'added': added_count,
+            'quarantined': result['quarantined'],
+            'total': len(records) + len(rejected)
+        }
+    
     except Exception as e:
         db.session.rollback()
         print(f"Error: {str(e)}")
-        return {'success': False, 'error': str(e)}
\ No newline at end of file
+        return {'success': False, 'error': str(e)}
+
+
+def parse_cisa_payload(data):
+    """Turn a CISA KEV payload into Threat column values and rejected records"""
+    return parse_records(data.get('vulnerabilities', []), _parse_vulnerability)
+
+
+def _parse_vulnerability(vuln):
+    return {
+        'threat_id': vuln['cveID'],
+        'source': 'CISA',
+        'threat_type': 'vulnerability',
+        'title': vuln.get('vulnerabilityName', 'Unknown'),
+        'description': vuln.get('shortDescription', ''),
+        'severity': 'critical',
+        'indicators': {
+            'vendor': vuln.get('vendorProject', ''),
+            'product': vuln.get('product', ''),
+            'cve_id': vuln['cveID']
+        },
+        'threat_metadata': {
+            'required_action': vuln.get('requiredAction', ''),
+            'due_date': vuln.get('dueDate', ''),
+            'known_ransomware': vuln.get('knownRansomwareCampaignUse', 'Unknown')
+        },
+        'date_discovered': datetime.strptime(vuln['dateAdded'], '%Y-%m-%d') if vuln.get('dateAdded') else None
+    }
\ No newline at end of file
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import math
+import os
+import struct
+import time
+from contextlib import contextmanager
+import numpy as np
+from sqlalchemy import inspect
+from models import Threat
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows dev server runs a single process
+    fcntl = None
+
+# Bloom filter file layout (little-endian):
+#   header  magic, version, bit count, hash count, item count, capacity
+#   bits    bit i is (byte i >> 3) & (1 << (i & 7))
+#
+# Sensors check a value by normalizing it (strip + lowercase), taking
+# sha256 of its UTF-8 bytes, reading h1 and h2 as the first two u64 of the
+# digest and testing bits ((h1 + i * h2) mod 2**64) mod bit_count for
+# i in 0..hash_count-1.
+FILTER_MAGIC = b'TIBLOOM1'
+HEADER = struct.Struct('<8sQQIQQ')
+
+# Indicator fields collected into each filter type
+FILTER_TYPES = {
+    'ip': ('ip_address',),
+    'url': ('url',)
+}
+
+# Filters are sized with room to grow so ingestion can add to them in place
+CAPACITY_HEADROOM = 2
+MIN_CAPACITY = 1024
+
+LOAD_CHUNK_SIZE = 500
+
+
+def _normalize(value):
+    return str(value).strip().lower()
+
+
+def _hash_pairs(values):
+    """(h1, h2) u64 arrays for a list of indicator values"""
+    digests = b''.join(hashlib.sha256(_normalize(value).encode('utf-8')).digest()[:16] for value in values)
+    pairs = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _bit_positions(values, num_bits, num_hashes):
+    h1, h2 = _hash_pairs(values)
+    rounds = np.arange(num_hashes, dtype=np.uint64)
+    # uint64 arithmetic wraps mod 2**64, matching the documented sensor check
+    return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(num_bits)
+
+
+def _set_bits(bits, values, num_bits, num_hashes):
+    if not values:
+        return
+    positions = _bit_positions(values, num_bits, num_hashes).ravel()
+    np.bitwise_or.at(bits, (positions >> np.uint64(3)).astype(np.int64),
+                     (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+
+def filter_dimensions(capacity, false_positive_rate):
+    """Optimal bit and hash counts for a capacity and target false-positive rate"""
+    num_bits = max(8, math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+    num_bits = (num_bits + 7) // 8 * 8
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter:
+    """Bloom filter over normalized indicator values"""
+
+    def __init__(self, num_bits, num_hashes, capacity, count=0, version=0, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.capacity = capacity
+        self.count = count
+        self.version = version
+        self.bits = bits if bits is not None else np.zeros(num_bits // 8, dtype=np.uint8)
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate):
+        num_bits, num_hashes = filter_dimensions(capacity, false_positive_rate)
+        return cls(num_bits, num_hashes, capacity)
+
+    def add(self, values):
+        values = list(values)
+        _set_bits(self.bits, values, self.num_bits, self.num_hashes)
+        self.count += len(values)
+
+    def __contains__(self, value):
+        positions = _bit_positions([value], self.num_bits, self.num_hashes)[0]
+        return all(self.bits[int(p) >> 3] & (1 << (int(p) & 7)) for p in positions)
+
+    def to_bytes(self):
+        return HEADER.pack(FILTER_MAGIC, self.version, self.num_bits, self.num_hashes,
+                           self.count, self.capacity) + self.bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, num_bits, num_hashes, count, capacity = HEADER.unpack_from(data, 0)
+        if magic != FILTER_MAGIC:
+            raise ValueError('Not a bloom filter file')
+        bits = np.frombuffer(data, dtype=np.uint8, offset=HEADER.size).copy()
+        return cls(num_bits, num_hashes, capacity, count=count, version=version, bits=bits)
+
+
+def filter_path(filter_type, filter_dir=None):
+    return os.path.join(filter_dir or Config.FILTER_DIR, f"{filter_type}.bloom")
+
+
+def _manifest_path(filter_dir=None):
+    return os.path.join(filter_dir or Config.FILTER_DIR, 'manifest.json')
+
+
+@contextmanager
+def _filter_lock(filter_dir=None):
+    """Serialise filter read-modify-write across worker processes"""
+    filter_dir = filter_dir or Config.FILTER_DIR
+    os.makedirs(filter_dir, exist_ok=True)
+
+    with open(os.path.join(filter_dir, '.lock'), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(filter_dir=None):
+    """Current version and parameters of every published filter"""
+    try:
+        with open(_manifest_path(filter_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_filter(filter_type, filter_dir=None):
+    try:
+        with open(filter_path(filter_type, filter_dir), 'rb') as f:
+            return BloomFilter.from_bytes(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _publish(filters, filter_dir=None):
+    """Write filter files, then the manifest that points sensors at them"""
+    filter_dir = filter_dir or Config.FILTER_DIR
+    os.makedirs(filter_dir, exist_ok=True)
+
+    manifest = load_manifest(filter_dir)
+    for filter_type, bloom in filters.items():
+        data = bloom.to_bytes()
+        _write_atomic(filter_path(filter_type, filter_dir), data)
+        manifest[filter_type] = {
+            'version': bloom.version,
+            'count': bloom.count,
+            'capacity': bloom.capacity,
+            'num_bits': bloom.num_bits,
+            'num_hashes': bloom.num_hashes,
+            'false_positive_rate': Config.FILTER_FALSE_POSITIVE_RATE,
+            'size': len(data),
+            'sha256': hashlib.sha256(data).hexdigest()
+        }
+
+    _write_atomic(_manifest_path(filter_dir), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def _collect_values(rows):
+    """Split indicator dicts into per-filter-type value sets"""
+    values = {filter_type: set() for filter_type in FILTER_TYPES}
+    for (indicators,) in rows:
+        indicators = indicators or {}
+        for filter_type, keys in FILTER_TYPES.items():
+            for key in keys:
+                if indicators.get(key):
+                    values[filter_type].add(_normalize(indicators[key]))
+    return values
+
+
+def _rebuild(filter_dir=None):
+    """Rebuild every filter from all active threats; caller holds the filter lock"""
+    rows = Threat.query.with_entities(Threat.indicators).filter_by(is_active=True).all()
+    values = _collect_values(rows)
+    version = time.time_ns()
+
+    filters = {}
+    for filter_type, type_values in values.items():
+        capacity = max(MIN_CAPACITY, len(type_values) * CAPACITY_HEADROOM)
+        bloom = BloomFilter.for_capacity(capacity, Config.FILTER_FALSE_POSITIVE_RATE)
+        bloom.add(type_values)
+        bloom.version = version
+        filters[filter_type] = bloom
+
+    _publish(filters, filter_dir)
+    return {'success': True, 'version': version, 'counts': {t: f.count for t, f in filters.items()}}
+
+
+def rebuild_filters(filter_dir=None):
+    """Rebuild every filter from all active threats"""
+    try:
+        with _filter_lock(filter_dir):
+            return _rebuild(filter_dir)
+
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def update_filters(new_threats, filter_dir=None):
+    """Add newly ingested indicators to the published filters.
+
+    Falls back to a full rebuild when a filter is missing, would exceed
+    its capacity (and so its false-positive target), or was built for a
+    different false-positive rate.
+    """
+    try:
+        threat_ids = [inspect(threat).identity[0] for threat in new_threats]
+        rows = []
+        for start in range(0, len(threat_ids), LOAD_CHUNK_SIZE):
+            rows.extend(Threat.query.with_entities(Threat.indicators).filter(
+                Threat.id.in_(threat_ids[start:start + LOAD_CHUNK_SIZE])
+            ).all())
+        values = _collect_values(rows)
+
+        # Another worker may publish between our load and publish; without
+        # the lock its indicators would be overwritten (false negatives)
+        with _filter_lock(filter_dir):
+            manifest = load_manifest(filter_dir)
+            version = time.time_ns()
+            filters = {}
+
+            for filter_type, type_values in values.items():
+                if not type_values:
+                    continue
+                bloom = load_filter(filter_type, filter_dir)
+                entry = manifest.get(filter_type, {})
+                if (bloom is None
+                        or bloom.count + len(type_values) > bloom.capacity
+                        or entry.get('false_positive_rate') != Config.FILTER_FALSE_POSITIVE_RATE):
+                    return _rebuild(filter_dir)
+                bloom.add(type_values)
+                bloom.version = version
+                filters[filter_type] = bloom
+
+            if filters:
+                _publish(filters, filter_dir)
+            return {'success': True, 'version': version, 'counts': {t: f.count for t, f in filters.items()}}
+
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
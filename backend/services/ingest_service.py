@@ -0,0 +1,292 @@
+import json
+from sqlalchemy import inspect, update
+from models import db, Threat, QuarantinedRecord, IngestCheckpoint
+from services.snapshot_service import rebuild_snapshot
+from services.watchlist_service import match_watchlists
+from services.scoring_service import rescore_threats
+from services.filter_service import update_filters, rebuild_filters
+from services.version_service import bump_version, THREATS_VERSION
+
+EXISTING_CHUNK_SIZE = 500
+
+# Records committed per transaction; a failure only ever loses one batch
+INGEST_BATCH_SIZE = 500
+
+
+def _existing_threat_ids(threat_ids):
+    """Map the given threat_ids that are already stored to their row ids"""
+    existing = {}
+    threat_ids = list(threat_ids)
+    for start in range(0, len(threat_ids), EXISTING_CHUNK_SIZE):
+        chunk = threat_ids[start:start + EXISTING_CHUNK_SIZE]
+        existing.update(
+            db.session.query(Threat.threat_id, Threat.id).filter(Threat.threat_id.in_(chunk)).all()
+        )
+    return existing
+
+
+def parse_records(items, parse_record):
+    """Run a per-record parser, setting aside records it cannot parse.
+
+    Returns (records, rejected) where rejected holds the raw item and
+    the error for each failure.
+    """
+    records = []
+    rejected = []
+
+    for item in items:
+        try:
+            records.append(parse_record(item))
+        except Exception as e:
+            rejected.append({'record': item, 'error': f"{type(e).__name__}: {e}"})
+
+    return records, rejected
+
+
+def _record_key(stage, record):
+    # Parsed records hold datetimes; keep them readable rather than dropping them
+    return stage, json.dumps(record, sort_keys=True, default=str)
+
+
+def _quarantined_keys(payload_sha256):
+    """Records already quarantined for a payload, so a rerun does not add them again"""
+    if not payload_sha256:
+        return set()
+
+    rows = db.session.query(QuarantinedRecord.stage, QuarantinedRecord.record).filter_by(
+        payload_sha256=payload_sha256
+    )
+    return {_record_key(stage, record) for stage, record in rows}
+
+
+def _quarantine(source, stage, record, error, payload_sha256=None, known=None):
+    key = _record_key(stage, record)
+    if known is not None:
+        if key in known:
+            return
+        known.add(key)
+
+    db.session.add(QuarantinedRecord(
+        source=source,
+        stage=stage,
+        payload_sha256=payload_sha256,
+        record=json.loads(key[1]),
+        error=error
+    ))
+
+
+def _insert_batch(records, source, payload_sha256, known=None):
+    """Insert one batch inside a savepoint, isolating bad records on failure"""
+    try:
+        with db.session.begin_nested():
+            threats = [Threat(**record) for record in records]
+            db.session.add_all(threats)
+        return threats, 0
+    except Exception:
+        pass
+
+    # Something in the batch was rejected by the database; retry record by
+    # record so only the offending ones end up in quarantine
+    threats = []
+    quarantined = 0
+    for record in records:
+        try:
+            with db.session.begin_nested():
+                threat = Threat(**record)
+                db.session.add(threat)
+            threats.append(threat)
+        except Exception as e:
+            _quarantine(source, 'store', record, f"{type(e).__name__}: {e}", payload_sha256, known)
+            quarantined += 1
+
+    return threats, quarantined
+
+
+def _update_batch(records, existing, source, payload_sha256, known=None):
+    """Overwrite stored threats with freshly parsed column values in one batched UPDATE"""
+    if not records:
+        return [], 0
+
+    rows = [{**record, 'id': existing[record['threat_id']]} for record in records]
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(update(Threat), rows)
+        return [row['id'] for row in rows], 0
+    except Exception:
+        pass
+
+    updated = []
+    quarantined = 0
+    for row, record in zip(rows, records):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(update(Threat), [row])
+            updated.append(row['id'])
+        except Exception as e:
+            _quarantine(source, 'store', record, f"{type(e).__name__}: {e}", payload_sha256, known)
+            quarantined += 1
+
+    return updated, quarantined
+
+
+def _start_checkpoint(source, payload_sha256, total):
+    """Offset to resume from for a payload whose previous run did not finish"""
+    if not payload_sha256:
+        return None, 0
+
+    checkpoint = db.session.get(IngestCheckpoint, payload_sha256)
+    if checkpoint and not checkpoint.completed and checkpoint.total == total:
+        return checkpoint, checkpoint.committed
+
+    if checkpoint is None:
+        checkpoint = IngestCheckpoint(payload_sha256=payload_sha256, source=source)
+        db.session.add(checkpoint)
+    checkpoint.total = total
+    checkpoint.committed = 0
+    checkpoint.completed = False
+    db.session.commit()
+    return checkpoint, 0
+
+
+def store_threats(records, source, rejected=None, payload_sha256=None, post_ingest=True, update_existing=False):
+    """Insert parsed threat records that are not stored yet.
+
+    records are dicts of Threat column values as produced by the feed
+    parsers and rejected the parse failures that go to quarantine.
+    Records are committed in batches of INGEST_BATCH_SIZE; when
+    payload_sha256 is given, a rerun of an interrupted payload resumes
+    after its last committed batch. With update_existing, records whose
+    threat_id is already stored overwrite its parsed columns (backfill
+    after a parser fix) instead of being skipped.
+
+    On a resume, resumed_ids holds the stored threats of the batches the
+    interrupted run committed; their derived data may never have been
+    refreshed, so it is refreshed along with the new threats.
+
+    With post_ingest=False the caller refreshes derived data itself and
+    then closes the checkpoint with complete_checkpoints.
+    """
+    checkpoint, offset = _start_checkpoint(source, payload_sha256, len(records))
+
+    resumed_ids = None
+    if offset:
+        resumed_ids = sorted(_existing_threat_ids({record['threat_id'] for record in records[:offset]}).values())
+
+    # Payloads are fetched again while unchanged and replayed; each bad
+    # record is kept once per payload
+    known = _quarantined_keys(payload_sha256)
+
+    quarantined = 0
+    if offset == 0:
+        for item in rejected or []:
+            _quarantine(source, 'parse', item['record'], item['error'], payload_sha256, known)
+            quarantined += 1
+        db.session.commit()
+
+    new_threats = []
+    updated_ids = []
+    for start in range(offset, len(records), INGEST_BATCH_SIZE):
+        batch = records[start:start + INGEST_BATCH_SIZE]
+        existing = _existing_threat_ids({record['threat_id'] for record in batch})
+
+        candidates = []
+        # Keyed by threat_id so a payload repeating a record updates it once
+        updates = {}
+        seen = set()
+        for record in batch:
+            if record['threat_id'] in existing:
+                if update_existing:
+                    updates[record['threat_id']] = record
+                continue
+            if record['threat_id'] in seen:
+                continue
+            seen.add(record['threat_id'])
+            candidates.append(record)
+
+        added, batch_quarantined = _insert_batch(candidates, source, payload_sha256, known)
+        quarantined += batch_quarantined
+
+        updated, batch_quarantined = _update_batch(list(updates.values()), existing, source, payload_sha256, known)
+        quarantined += batch_quarantined
+
+        if added or updated:
+            bump_version(THREATS_VERSION)
+        if checkpoint is not None:
+            checkpoint.committed = start + len(batch)
+        db.session.commit()
+        new_threats.extend(added)
+        updated_ids.extend(updated)
+
+    # Only marked complete once derived data is refreshed, so a crash in
+    # after_ingest is picked up again by the next run of this payload
+    if post_ingest:
+        after_ingest(new_threats, resumed_ids)
+        after_update(updated_ids)
+        complete_checkpoints([payload_sha256])
+
+    return {
+        'new_threats': new_threats,
+        'updated_ids': updated_ids,
+        'resumed_ids': resumed_ids or [],
+        'quarantined': quarantined
+    }
+
+
+def complete_checkpoints(payload_sha256s):
+    """Mark payloads as fully ingested, derived data included"""
+    payload_sha256s = [sha for sha in payload_sha256s if sha]
+    for start in range(0, len(payload_sha256s), EXISTING_CHUNK_SIZE):
+        IngestCheckpoint.query.filter(
+            IngestCheckpoint.payload_sha256.in_(payload_sha256s[start:start + EXISTING_CHUNK_SIZE])
+        ).update({'completed': True}, synchronize_session=False)
+    db.session.commit()
+
+
+def _check_refresh(results):
+    """Raise if any derived-data step failed; each step reports rather than raises"""
+    errors = [f"{step}: {result.get('error')}" for step, result in results if not result.get('success')]
+    if errors:
+        raise RuntimeError(f"Derived data refresh failed ({'; '.join(errors)})")
+
+
+def after_ingest(new_threats, resumed_ids=None):
+    """Refresh everything derived from the threat table after new threats land.
+
+    resumed_ids are threats committed by an interrupted run that never got
+    this far. Which of them reached the filters is unknown, so filters are
+    rebuilt instead of added to; watchlist matching skips existing matches.
+
+    Every step runs even if an earlier one fails; failures are raised
+    together afterwards, so the payload's checkpoint stays open.
+    """
+    threat_ids = [inspect(threat).identity[0] for threat in new_threats]
+    threat_ids.extend(resumed_ids or [])
+    if not threat_ids:
+        return
+
+    # Scores of the rest of the table only drift with recency decay; the
+    # full rescore runs from /api/feeds/rescore or 'flask rescore-threats'
+    results = [
+        ('scores', rescore_threats(threat_ids)),
+        ('snapshot', rebuild_snapshot()),
+        ('filters', rebuild_filters() if resumed_ids else update_filters(new_threats)),
+        ('watchlists', match_watchlists(threat_ids))
+    ]
+    _check_refresh(results)
+
+
+def after_update(threat_ids):
+    """Refresh derived data after stored threats were overwritten.
+
+    Indicators may have changed, so filters are rebuilt rather than
+    added to. Watchlists are not re-matched; these threats already were.
+    """
+    if not threat_ids:
+        return
+
+    _check_refresh([
+        ('scores', rescore_threats(threat_ids)),
+        ('snapshot', rebuild_snapshot()),
+        ('filters', rebuild_filters())
+    ])
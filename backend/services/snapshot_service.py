@@ -0,0 +1,188 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from models import Threat
+from config import Config
+
+# File layout (all little-endian):
+#   header   magic, format version, entry count, threat count, generation
+#   entries  (indicator hash u64, threat index u32), sorted by hash
+#   threats  (blob offset u32, blob length u32), one per threat index
+#   blob     compact JSON summary of each threat, UTF-8
+SNAPSHOT_MAGIC = b'TISNAP01'
+SNAPSHOT_FORMAT = 1
+
+HEADER = struct.Struct('<8sIIIQ')
+ENTRY = struct.Struct('<QI')
+THREAT = struct.Struct('<II')
+
+# Indicator fields worth looking up directly
+INDEXED_INDICATORS = ('ip_address', 'url', 'host', 'cve_id')
+
+
+def normalize_indicator(value):
+    """Normalize an indicator value so lookups are case/whitespace insensitive"""
+    return str(value).strip().lower()
+
+
+def hash_indicator(value):
+    """64-bit hash of a normalized indicator value"""
+    digest = hashlib.blake2b(normalize_indicator(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def rebuild_snapshot(path=None):
+    """Rebuild the indicator snapshot from active threats and swap it in atomically"""
+    path = path or Config.SNAPSHOT_PATH
+
+    try:
+        rows = Threat.query.with_entities(
+            Threat.id,
+            Threat.threat_id,
+            Threat.source,
+            Threat.threat_type,
+            Threat.severity,
+            Threat.indicators
+        ).filter_by(is_active=True).order_by(Threat.id).all()
+
+        entries = []
+        threat_records = []
+        blob = bytearray()
+
+        for index, (row_id, threat_id, source, threat_type, severity, indicators) in enumerate(rows):
+            summary = json.dumps({
+                'id': row_id,
+                'threat_id': threat_id or '',
+                'source': source or '',
+                'threat_type': threat_type or '',
+                'severity': severity or ''
+            }, separators=(',', ':')).encode('utf-8')
+            threat_records.append((len(blob), len(summary)))
+            blob += summary
+
+            values = {threat_id} if threat_id else set()
+            for key in INDEXED_INDICATORS:
+                if (indicators or {}).get(key):
+                    values.add(indicators[key])
+
+            for value in values:
+                entries.append((hash_indicator(value), index))
+
+        entries.sort()
+        generation = time.time_ns()
+
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, len(entries), len(threat_records), generation))
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+            for record in threat_records:
+                f.write(THREAT.pack(*record))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Readers that already mapped the old file keep their inode until they swap
+        os.replace(tmp_path, path)
+
+        return {'success': True, 'threats': len(threat_records), 'indicators': len(entries), 'generation': generation}
+
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+class IndicatorSnapshot:
+    """Read-only, memory-mapped view of the indicator snapshot file.
+
+    Every worker maps the same file, so the pages are shared through the OS
+    page cache instead of being copied into each process. A rebuilt file is
+    picked up on the next lookup by comparing the inode.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.SNAPSHOT_PATH
+        self._mm = None
+        self._file_id = None
+        self.entry_count = 0
+        self.threat_count = 0
+        self.generation = None
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if file_id == self._file_id:
+            return True
+
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, entry_count, threat_count, generation = HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+            mm.close()
+            raise ValueError(f"Unsupported snapshot file: {self.path}")
+
+        # The previous map is dropped rather than closed; in-flight lookups
+        # in other threads may still hold a reference to it
+        self._mm = mm
+        self._file_id = file_id
+        self.entry_count = entry_count
+        self.threat_count = threat_count
+        self.generation = generation
+        return True
+
+    def is_available(self):
+        return self._refresh()
+
+    def lookup(self, value):
+        """Return summaries of all active threats carrying this indicator"""
+        if not self._refresh():
+            return None
+
+        mm = self._mm
+        entry_count = self.entry_count
+        entries_start = HEADER.size
+        threats_start = entries_start + entry_count * ENTRY.size
+        blob_start = threats_start + self.threat_count * THREAT.size
+        target = hash_indicator(value)
+
+        # Lower-bound binary search over the sorted hash column
+        lo, hi = 0, entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ENTRY.unpack_from(mm, entries_start + mid * ENTRY.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        results = []
+        while lo < entry_count:
+            key, index = ENTRY.unpack_from(mm, entries_start + lo * ENTRY.size)
+            if key != target:
+                break
+            offset, length = THREAT.unpack_from(mm, threats_start + index * THREAT.size)
+            start = blob_start + offset
+            results.append(json.loads(mm[start:start + length]))
+            lo += 1
+
+        return results
+
+
+_snapshot = None
+
+
+def get_snapshot():
+    """Per-process snapshot reader"""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = IndicatorSnapshot()
+    return _snapshot
@@ -1,6 +1,8 @@
 import requests
 from datetime import datetime
-from models import db, Threat
+from models import db
+from services.archive_service import archive_payload
+from services.ingest_service import store_threats, parse_records
 
 URLHAUS_API_URL = "https://urlhaus-api.abuse.ch/v1/urls/recent/"
 
@@ -10,52 +12,54 @@ def fetch_urlhaus_threats():
     try:
         response = requests.post(URLHAUS_API_URL, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        archived = archive_payload('URLhaus', response.content, url=URLHAUS_API_URL)
         
-        if data['query_status'] != 'ok':
-            return {'success': False, 'error': 'URLhaus API returned error'}
+        records, rejected = parse_urlhaus_payload(response.json())
+        result = store_threats(records, 'URLhaus', rejected=rejected, payload_sha256=archived.get('sha256'))
         
-        urls = data.get('urls', [])
-        added_count = 0
-        
-        for url_data in urls:
-            threat_id = f"URL-{url_data['id']}"
-            
-            # Check if already exists
-            existing = Threat.query.filter_by(threat_id=threat_id).first()
-            
-            if not existing:
-                threat = Threat(
-                    threat_id=threat_id,
-                    source='URLhaus',
-                    threat_type='malware_url',
-                    title=f"Malware URL: {url_data.get('url_status', 'Unknown')}",
-                    description=url_data.get('url', '')[:500],  # Truncate long URLs
-                    severity=_get_severity_from_threat(url_data.get('threat', '')),
-                    indicators={
-                        'url': url_data.get('url', ''),
-                        'host': url_data.get('host', ''),
-                        'url_status': url_data.get('url_status', '')
-                    },
-                    metadata={
-                        'threat_type': url_data.get('threat', ''),
-                        'tags': url_data.get('tags', []),
-                        'reporter': url_data.get('reporter', 'Unknown'),
-                        'larted': url_data.get('larted', False)
-                    },
-                    date_discovered=datetime.fromisoformat(url_data['dateadded'].replace(' ', 'T'))
-                )
-                db.session.add(threat)
-                added_count += 1
-        
-        db.session.commit()
-        return {'success': True, 'added': added_count, 'total': len(urls)}
+        return {
+            'success': True,
+            'added': len(result['new_threats']),
+            'quarantined': result['quarantined'],
+            'total': len(records) + len(rejected)
+        }
     
     except Exception as e:
         db.session.rollback()
         return {'success': False, 'error': str(e)}
 
 
+def parse_urlhaus_payload(data):
+    """Turn a URLhaus recent-URLs payload into Threat column values and rejected records"""
+    if data['query_status'] != 'ok':
+        raise ValueError('URLhaus API returned error')
+    
+    return parse_records(data.get('urls', []), _parse_url)
+
+
+def _parse_url(url_data):
+    return {
+        'threat_id': f"URL-{url_data['id']}",
+        'source': 'URLhaus',
+        'threat_type': 'malware_url',
+        'title': f"Malware URL: {url_data.get('url_status', 'Unknown')}",
+        'description': url_data.get('url', '')[:500],  # Truncate long URLs
+        'severity': _get_severity_from_threat(url_data.get('threat', '')),
+        'indicators': {
+            'url': url_data.get('url', ''),
+            'host': url_data.get('host', ''),
+            'url_status': url_data.get('url_status', '')
+        },
+        'threat_metadata': {
+            'threat_type': url_data.get('threat', ''),
+            'tags': url_data.get('tags', []),
+            'reporter': url_data.get('reporter', 'Unknown'),
+            'larted': url_data.get('larted', False)
+        },
+        'date_discovered': datetime.fromisoformat(url_data['dateadded'].replace(' ', 'T'))
+    }
+
+
 def _get_severity_from_threat(threat_type):
     """Convert threat type to severity level"""
     high_severity = ['ransomware', 'banking_trojan', 'backdoor']
@@ -68,4 +72,4 @@ def _get_severity_from_threat(threat_type):
     elif any(ms in threat_lower for ms in medium_severity):
         return 'medium'
     else:
-        return 'low'
\ No newline at end of file
+        return 'low'
@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from models import db, DataVersion
+
+THREATS_VERSION = 'threats'
+
+UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert
+}
+
+
+def bookmarks_version_key(user_id):
+    return f"bookmarks:{user_id}"
+
+
+def get_version(key):
+    """Current version of a piece of data, 0 if it never changed"""
+    row = db.session.get(DataVersion, key)
+    return row.version if row else 0
+
+
+def bump_version(key):
+    """Increment a data version as part of the caller's transaction.
+
+    The first bump of a key creates its row; doing that with an upsert
+    keeps two concurrent first bumps from failing on the primary key.
+    """
+    now = datetime.utcnow()
+    dialect_insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+
+    if dialect_insert:
+        db.session.execute(
+            dialect_insert(DataVersion)
+            .values(key=key, version=1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[DataVersion.key],
+                set_={'version': DataVersion.version + 1, 'updated_at': now}
+            )
+        )
+        return
+
+    # Other databases: update, else insert, retrying as an update if a
+    # concurrent request created the row first
+    updated = DataVersion.query.filter_by(key=key).update(
+        {'version': DataVersion.version + 1, 'updated_at': now},
+        synchronize_session=False
+    )
+    if updated:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(DataVersion(key=key, version=1, updated_at=now))
+    except IntegrityError:
+        DataVersion.query.filter_by(key=key).update(
+            {'version': DataVersion.version + 1, 'updated_at': now},
+            synchronize_session=False
+        )
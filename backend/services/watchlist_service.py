@@ -0,0 +1,214 @@
+import ipaddress
+from collections import deque
+from models import db, Threat, Watchlist, WatchlistNotification
+
+LOAD_CHUNK_SIZE = 500
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton matching many keywords in a single pass over text"""
+
+    def __init__(self, keywords):
+        # keywords: dict of keyword -> set of watchlist ids
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for keyword, watchlist_ids in keywords.items():
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((keyword, watchlist_ids))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """Yield (keyword, watchlist ids) for every keyword found in text"""
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for match in self.output[state]:
+                yield match
+
+
+class WatchlistIndex:
+    """Inverted index over every user's watchlist terms.
+
+    Each threat is probed once per term type (dict lookups, one mask per
+    distinct prefix length, one automaton pass for keywords), so matching
+    cost depends on the batch, not on how many watchlists exist.
+    """
+
+    def __init__(self, watchlists):
+        self.owners = {}
+        self.vendors = {}
+        self.products = {}
+        self.cve_exact = {}
+        self.cve_prefixes = {}
+        self.networks = {}
+        keywords = {}
+
+        for watchlist in watchlists:
+            self.owners[watchlist.id] = watchlist.user_id
+
+            for vendor in watchlist.vendors or []:
+                self.vendors.setdefault(_normalize(vendor), set()).add(watchlist.id)
+
+            for product in watchlist.products or []:
+                self.products.setdefault(_normalize(product), set()).add(watchlist.id)
+
+            for pattern in watchlist.cve_patterns or []:
+                pattern = _normalize(pattern)
+                if pattern.endswith('*'):
+                    self.cve_prefixes.setdefault(pattern[:-1], set()).add(watchlist.id)
+                else:
+                    self.cve_exact.setdefault(pattern, set()).add(watchlist.id)
+
+            for ip_range in watchlist.ip_ranges or []:
+                try:
+                    network = ipaddress.ip_network(ip_range, strict=False)
+                except ValueError:
+                    continue
+                key = (network.version, network.prefixlen)
+                self.networks.setdefault(key, {}).setdefault(int(network.network_address), set()).add(watchlist.id)
+
+            for keyword in watchlist.keywords or []:
+                if _normalize(keyword):
+                    keywords.setdefault(_normalize(keyword), set()).add(watchlist.id)
+
+        self.keywords = KeywordMatcher(keywords) if keywords else None
+
+    def match(self, threat):
+        """Return {watchlist_id: [matched terms]} for a single threat"""
+        matches = {}
+        indicators = threat.indicators or {}
+
+        def add(watchlist_ids, term):
+            for watchlist_id in watchlist_ids:
+                matches.setdefault(watchlist_id, []).append(term)
+
+        vendor = _normalize(indicators.get('vendor', ''))
+        if vendor in self.vendors:
+            add(self.vendors[vendor], f"vendor:{vendor}")
+
+        product = _normalize(indicators.get('product', ''))
+        if product in self.products:
+            add(self.products[product], f"product:{product}")
+
+        cve_id = _normalize(indicators.get('cve_id', ''))
+        if cve_id:
+            if cve_id in self.cve_exact:
+                add(self.cve_exact[cve_id], f"cve:{cve_id}")
+            for end in range(len(cve_id) + 1):
+                prefix = cve_id[:end]
+                if prefix in self.cve_prefixes:
+                    add(self.cve_prefixes[prefix], f"cve:{prefix}*")
+
+        if self.networks and indicators.get('ip_address'):
+            try:
+                address = ipaddress.ip_address(indicators['ip_address'])
+            except ValueError:
+                address = None
+            if address is not None:
+                for (version, prefixlen), networks in self.networks.items():
+                    if version != address.version:
+                        continue
+                    shift = address.max_prefixlen - prefixlen
+                    masked = (int(address) >> shift) << shift
+                    if masked in networks:
+                        add(networks[masked], f"ip_range:{ipaddress.ip_network((masked, prefixlen))}")
+
+        if self.keywords:
+            text = _normalize(' '.join(filter(None, [threat.title, threat.description, threat.threat_id])))
+            for keyword, watchlist_ids in self.keywords.search(text):
+                add(watchlist_ids, f"keyword:{keyword}")
+
+        return matches
+
+
+def _normalize(value):
+    return str(value or '').strip().lower()
+
+
+_index_cache = {'key': None, 'index': None}
+
+
+def get_watchlist_index():
+    """Compiled index of all watchlists, rebuilt only when watchlists change"""
+    key = db.session.query(
+        db.func.count(Watchlist.id),
+        db.func.max(Watchlist.id),
+        db.func.max(Watchlist.updated_at)
+    ).one()
+    key = tuple(key)
+
+    if _index_cache['key'] != key:
+        _index_cache['index'] = WatchlistIndex(Watchlist.query.all())
+        _index_cache['key'] = key
+
+    return _index_cache['index']
+
+
+def match_watchlists(threat_ids):
+    """Match stored threats against all watchlists and store notifications.
+
+    Pairs that already have a notification are skipped, so threats can be
+    re-matched safely, e.g. when an interrupted ingestion is resumed.
+    """
+    try:
+        if not threat_ids:
+            return {'success': True, 'notifications': 0}
+
+        index = get_watchlist_index()
+        if not index.owners:
+            return {'success': True, 'notifications': 0}
+
+        # Load threats and their existing notifications in a few IN queries
+        # instead of one SELECT per threat
+        threat_ids = list(threat_ids)
+        threats = []
+        notified = set()
+        for start in range(0, len(threat_ids), LOAD_CHUNK_SIZE):
+            chunk = threat_ids[start:start + LOAD_CHUNK_SIZE]
+            threats.extend(Threat.query.filter(Threat.id.in_(chunk)).all())
+            notified.update(
+                db.session.query(WatchlistNotification.watchlist_id, WatchlistNotification.threat_id)
+                .filter(WatchlistNotification.threat_id.in_(chunk))
+                .all()
+            )
+
+        created = 0
+        for threat in threats:
+            for watchlist_id, terms in index.match(threat).items():
+                if (watchlist_id, threat.id) in notified:
+                    continue
+                db.session.add(WatchlistNotification(
+                    user_id=index.owners[watchlist_id],
+                    watchlist_id=watchlist_id,
+                    threat_id=threat.id,
+                    matched_on=terms
+                ))
+                created += 1
+
+        db.session.commit()
+        return {'success': True, 'notifications': created}
+
+    except Exception as e:
+        db.session.rollback()
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,71 @@
+"""Pins the bloom filter file format shared with external sensors.
+
+The sensor check below is written from the format comment in
+services/filter_service.py in plain Python, without numpy; if it stops
+agreeing with the filters the backend publishes, every deployed sensor
+would silently miss indicators.
+"""
+import hashlib
+import struct
+from services.filter_service import BloomFilter
+
+SENSOR_HEADER = struct.Struct('<8sQQIQQ')
+
+
+def sensor_contains(data, value):
+    magic, version, num_bits, num_hashes, count, capacity = SENSOR_HEADER.unpack_from(data, 0)
+    assert magic == b'TIBLOOM1'
+    bits = data[SENSOR_HEADER.size:]
+
+    digest = hashlib.sha256(str(value).strip().lower().encode('utf-8')).digest()
+    h1 = int.from_bytes(digest[0:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little')
+
+    for i in range(num_hashes):
+        position = ((h1 + i * h2) % 2 ** 64) % num_bits
+        if not bits[position >> 3] & (1 << (position & 7)):
+            return False
+    return True
+
+
+def test_header_layout():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    bloom.add(['10.0.0.1', '10.0.0.2'])
+    bloom.version = 42
+    data = bloom.to_bytes()
+
+    magic, version, num_bits, num_hashes, count, capacity = SENSOR_HEADER.unpack_from(data, 0)
+    assert (magic, version, num_bits, num_hashes, count, capacity) == (
+        b'TIBLOOM1', 42, bloom.num_bits, bloom.num_hashes, 2, 1000
+    )
+    assert len(data) == SENSOR_HEADER.size + num_bits // 8
+
+
+def test_sensor_finds_every_added_value():
+    values = [f"192.0.2.{i}" for i in range(256)] + [f"http://example.com/{i}" for i in range(256)]
+    bloom = BloomFilter.for_capacity(len(values), 0.001)
+    bloom.add(values)
+    data = bloom.to_bytes()
+
+    assert all(sensor_contains(data, value) for value in values)
+    # Sensors normalize the same way the backend does
+    assert sensor_contains(data, '  HTTP://EXAMPLE.COM/7 ')
+
+
+def test_sensor_agrees_on_absent_values():
+    bloom = BloomFilter.for_capacity(512, 0.001)
+    bloom.add(f"198.51.100.{i}" for i in range(200))
+    data = bloom.to_bytes()
+
+    probes = [f"203.0.113.{i}" for i in range(256)]
+    assert [sensor_contains(data, value) for value in probes] == [value in bloom for value in probes]
+    assert sum(sensor_contains(data, value) for value in probes) < 5
+
+
+def test_round_trip():
+    bloom = BloomFilter.for_capacity(100, 0.01)
+    bloom.add(['evil.test'])
+    loaded = BloomFilter.from_bytes(bloom.to_bytes())
+
+    assert 'evil.test' in loaded
+    assert loaded.to_bytes() == bloom.to_bytes()